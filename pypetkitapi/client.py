@@ -1,17 +1,23 @@
 """Pypetkit Client: A Python library for interfacing with PetKit"""
 
 import asyncio
-from datetime import datetime, timedelta
+from collections import defaultdict
+from collections.abc import Callable, Coroutine, Mapping
+from contextlib import nullcontext
+from datetime import datetime
 from enum import StrEnum
+from functools import cache
 import hashlib
 from http import HTTPMethod
+import importlib.util
 import logging
 import statistics
-from typing import Any
+import time
+from types import MappingProxyType
+from typing import Any, Self
 
 import aiohttp
-from aiohttp import ContentTypeError
-import m3u8
+from pydantic import TypeAdapter
 from tenacity import (
     retry,
     retry_if_exception_type,
@@ -24,7 +30,9 @@ from pypetkitapi.bluetooth import BluetoothManager
 from pypetkitapi.command import ACTIONS_MAP
 from pypetkitapi.const import (
     CLIENT_NFO,
+    CONNECTOR_LIMIT,
     DEFAULT_COUNTRY,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
     DEFAULT_TZ,
     DEVICE_DATA,
     DEVICE_RECORDS,
@@ -35,10 +43,15 @@ from pypetkitapi.const import (
     DEVICES_WATER_FOUNTAIN,
     ERR_KEY,
     FEEDER_WITH_CAMERA,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
     LITTER_NO_CAMERA,
     LITTER_WITH_CAMERA,
     LIVE_DATA,
     LOGIN_DATA,
+    MAX_CONCURRENT_REQUESTS,
     PET,
     PTK_DBG,
     RES_KEY,
@@ -76,7 +89,7 @@ from pypetkitapi.exceptions import (
 from pypetkitapi.feeder_container import Feeder, FeederRecord
 from pypetkitapi.litter_container import Litter, LitterRecord, LitterStats, PetOutGraph
 from pypetkitapi.purifier_container import Purifier
-from pypetkitapi.utils import get_timezone_offset
+from pypetkitapi.utils import async_get_timezone_offset, parse_m3u8
 from pypetkitapi.water_fountain_container import WaterFountain, WaterFountainRecord
 
 data_handlers = {}
@@ -92,8 +105,82 @@ def data_handler(data_type):
     return wrapper
 
 
+@cache
+def get_list_adapter(data_class: type[Any]) -> TypeAdapter:
+    """Return a validator for a list of data class items, built once per data class.
+    :param data_class: Data class
+    :return: TypeAdapter validating a list of the data class.
+    """
+    return TypeAdapter(list[data_class])  # type: ignore[valid-type]
+
+
+@cache
+def get_device_data_url(data_class: type[Any], device_type: str) -> str | None:
+    """Return the URL to fetch a data class for a device type.
+    Endpoints only depend on the data class and the device type, they are computed once.
+    :param data_class: Data class
+    :param device_type: Device type.
+    :return: URL of the endpoint, None if the device type has no endpoint.
+    """
+    endpoint = data_class.get_endpoint(device_type)
+    if endpoint is None:
+        return None
+    return f"{device_type}/{endpoint}"
+
+
 _LOGGER = logging.getLogger(__name__)
 
+# Errors affecting the whole account, they are not limited to a single device
+ACCOUNT_ERRORS = (
+    PetkitAuthenticationError,
+    PetkitAuthenticationUnregisteredEmailError,
+    PetkitRegionalServerNotFoundError,
+    PetkitSessionError,
+    PetkitSessionExpiredError,
+)
+
+# Exceptions raised for the error codes returned by the API
+API_ERRORS: dict[int, Callable[[str], PypetkitError]] = {
+    1: lambda msg: PetkitServerBusyError(f"Server busy: {msg}"),
+    5: lambda msg: PetkitSessionExpiredError(
+        f"Session expired: {msg}. WARNING : Make sure you're not using your main PetKit app account. Use a separate one for Home Assistant. Refer to the documentation for more details."
+    ),
+    122: lambda msg: PetkitAuthenticationError(f"Authentication failed: {msg}"),
+    125: lambda msg: PetkitAuthenticationUnregisteredEmailError(),
+}
+
+# Brotli is optional, aiohttp can only decode br responses when it is installed
+HAS_BROTLI = any(
+    importlib.util.find_spec(module) is not None for module in ("brotli", "brotlicffi")
+)
+
+# Headers sent with every request, only the timezone ones depend on the client
+STATIC_HEADERS: Mapping[str, str] = MappingProxyType(
+    {
+        "Accept": Header.ACCEPT.value,
+        "Accept-Language": Header.ACCEPT_LANG.value,
+        "Accept-Encoding": (
+            Header.ENCODING_BR.value if HAS_BROTLI else Header.ENCODING.value
+        ),
+        "Content-Type": Header.CONTENT_TYPE.value,
+        "User-Agent": Header.AGENT.value,
+        "X-Img-Version": Header.IMG_VERSION.value,
+        "X-Locale": Header.LOCALE.value,
+        "X-Client": Header.CLIENT.value,
+        "X-Hour": Header.HOUR.value,
+        "X-Api-Version": Header.API_VERSION.value,
+    }
+)
+
+# aiodns is optional, when installed it replaces the default threaded resolver
+HAS_AIODNS = importlib.util.find_spec("aiodns") is not None
+
+# orjson is optional, when installed it replaces the standard JSON decoder
+if importlib.util.find_spec("orjson") is not None:
+    from orjson import loads as json_loads
+else:
+    from json import loads as json_loads  # type: ignore[assignment]
+
 
 class PetKitClient:
     """Petkit Client"""
@@ -116,13 +203,18 @@ class PetKitClient:
 
         self.username = username
         self.password = password
+        self._password_md5 = hashlib.md5(password.encode()).hexdigest()
         self.region = region.lower()
         self.timezone = timezone
+        self._regional_gateway: str | None = None
         self._session: SessionInfo | None = None
+        self._session_headers: dict[str, str] = {}
+        self._login_lock = asyncio.Lock()
         self.account_data: list[AccountData] = []
         self.petkit_entities: dict[
             int, Feeder | Litter | WaterFountain | Purifier | Pet
         ] = {}
+        self._pets_list: list[Pet] = []
         self.req = PrepReq(
             base_url=PetkitDomain.PASSPORT_PETKIT,
             session=session,
@@ -131,6 +223,13 @@ class PetKitClient:
         )
         self.bluetooth_manager = BluetoothManager(self, **kwargs)
         self._debug_test = kwargs.get(PTK_DBG, False)
+        self._fetch_sem = asyncio.Semaphore(
+            kwargs.get(MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)
+        )
+        # Bind the registered data handlers once, instead of on every fetch
+        self._data_handlers = {
+            data_type: func.__get__(self) for data_type, func in data_handlers.items()
+        }
         from pypetkitapi import MediaManager
 
         from . import __version__
@@ -148,6 +247,22 @@ class PetKitClient:
             for pkg in packages:
                 _LOGGER.info(pkg)
 
+    async def __aenter__(self) -> Self:
+        """Enter the async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Exit the async context manager and release the HTTP session."""
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the HTTP session if it was created by the client."""
+        await self.req.close()
+
+    async def get_http_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session used by the client, to download files with it."""
+        return await self.req.get_session()
+
     async def _get_base_url(self) -> None:
         """Get the list of API servers, filter by region, and return the matching server."""
         _LOGGER.debug("Getting API server list")
@@ -158,20 +273,30 @@ class PetKitClient:
             _LOGGER.debug("Using specific China server: %s", PetkitDomain.CHINA_SRV)
             return
 
+        # The regional server does not change, reuse it on re-login
+        if self._regional_gateway is not None:
+            self.req.base_url = self._regional_gateway
+            _LOGGER.debug("Using cached regional server: %s", self._regional_gateway)
+            return
+
         response = await self.req.request(
             method=HTTPMethod.GET,
             url=PetkitEndpoint.REGION_SERVERS,
         )
 
-        # Filter the servers by region
+        # Index the servers by region name and id
+        servers: dict[str, dict] = {}
         for region in response.get("list", []):
-            server = RegionInfo(**region)
-            if server.name.lower() == self.region or server.id.lower() == self.region:
-                self.region = server.id.lower()
-                self.req.base_url = server.gateway
-                _LOGGER.debug("Found matching server: %s", server)
-                return
-        raise PetkitRegionalServerNotFoundError(self.region)
+            servers[str(region.get("name", "")).lower()] = region
+            servers[str(region.get("id", "")).lower()] = region
+
+        if self.region not in servers:
+            raise PetkitRegionalServerNotFoundError(self.region)
+
+        server = RegionInfo(**servers[self.region])
+        self.region = server.id.lower()
+        self.req.base_url = self._regional_gateway = server.gateway
+        _LOGGER.debug("Found matching server: %s", server)
 
     async def request_login_code(self) -> bool:
         """Request a login code to be sent to the user's email."""
@@ -199,7 +324,7 @@ class PetKitClient:
         # Prepare the data to send
         client_nfo = CLIENT_NFO.copy()
         client_nfo["timezoneId"] = self.timezone
-        client_nfo["timezone"] = await get_timezone_offset(self.timezone)
+        client_nfo["timezone"] = await async_get_timezone_offset(self.timezone)
 
         data = LOGIN_DATA.copy()
         data["client"] = str(client_nfo)
@@ -212,7 +337,7 @@ class PetKitClient:
             data["validCode"] = valid_code
         else:
             _LOGGER.debug("Login method: using password")
-            data["password"] = hashlib.md5(self.password.encode()).hexdigest()
+            data["password"] = self._password_md5
 
         # Send the login request
         response = await self.req.request(
@@ -220,10 +345,9 @@ class PetKitClient:
             url=PetkitEndpoint.LOGIN,
             data=data,
         )
-        session_data = response["session"]
-        self._session = SessionInfo(**session_data)
-        expiration_date = datetime.now() + timedelta(seconds=self._session.expires_in)
-        _LOGGER.debug("Login successful (token expiration %s)", expiration_date)
+        session = SessionInfo(**response["session"])
+        self._set_session(session)
+        _LOGGER.debug("Login successful (token expiration %s)", session.expires_at)
 
     async def refresh_session(self) -> None:
         """Refresh the session."""
@@ -234,25 +358,40 @@ class PetKitClient:
             data=LOGIN_DATA,
             headers=await self.get_session_id(),
         )
-        session_data = response["session"]
-        self._session = SessionInfo(**session_data)
-        self._session.refreshed_at = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")
-        _LOGGER.debug("Session refreshed at %s", self._session.refreshed_at)
+        session = SessionInfo(**response["session"])
+        session.refreshed_at = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")
+        self._set_session(session)
+        _LOGGER.debug("Session refreshed at %s", session.refreshed_at)
+
+    def _set_session(self, session: SessionInfo) -> None:
+        """Store a new session and the matching headers.
+        :param session: Session returned by the API.
+        """
+        self._session = session
+        self._session_headers = {"F-Session": session.id, "X-Session": session.id}
 
-    async def validate_session(self) -> None:
-        """Check if the session is still valid and refresh or re-login if necessary."""
+    def _is_session_expired(self) -> bool:
+        """Return True if there is no session or if the current one has expired."""
         if self._session is None:
-            _LOGGER.debug("No token, logging in")
-            await self.login()
-            return
+            return True
+        expires_at = self._session.expires_at
+        return datetime.now(tz=expires_at.tzinfo) >= expires_at
 
-        created = datetime.strptime(self._session.created_at, "%Y-%m-%dT%H:%M:%S.%f%z")
-        is_expired = datetime.now(tz=created.tzinfo) - created >= timedelta(
-            seconds=self._session.expires_in
-        )
+    async def validate_session(self) -> None:
+        """Check if the session is still valid and refresh or re-login if necessary.
+        Concurrent callers wait for a single login instead of each starting their own.
+        """
+        if not self._is_session_expired():
+            return
 
-        if is_expired:
-            _LOGGER.debug("Token expired, re-logging in")
+        async with self._login_lock:
+            # Another caller may have logged in while we were waiting for the lock
+            if not self._is_session_expired():
+                return
+            if self._session is None:
+                _LOGGER.debug("No token, logging in")
+            else:
+                _LOGGER.debug("Token expired, re-logging in")
             await self.login()
         # elif (max_age / 2) < token_age < max_age:
         #     _LOGGER.debug("Token still OK, but refreshing session")
@@ -263,7 +402,48 @@ class PetKitClient:
         await self.validate_session()
         if self._session is None:
             raise PetkitSessionError("No session ID available")
-        return {"F-Session": self._session.id, "X-Session": self._session.id}
+        return self._session_headers
+
+    async def _renew_session(self, rejected_headers: dict) -> None:
+        """Log in again after the server rejected the session.
+        Concurrent callers rejected with the same session wait for a single login.
+        :param rejected_headers: Session headers rejected by the server.
+        """
+        async with self._login_lock:
+            # Another caller may have logged in while we were waiting for the lock
+            if (
+                self._session is not None
+                and self._session_headers is not rejected_headers
+            ):
+                return
+            _LOGGER.debug("Session rejected by the server, re-logging in")
+            await self.login()
+
+    async def _session_request(
+        self, method: str, url: str, throttle: bool = False, **kwargs
+    ) -> Any:
+        """Make a request with the session headers.
+        If the server rejects the session, log in again and retry the request once.
+        :param method: HTTP method.
+        :param url: URL of the API endpoint.
+        :param throttle: Hold a fetch slot while the request is sent. The session is
+        resolved before taking the slot, so a re-login never holds a slot.
+        :return: Response from the API.
+        """
+        limiter = self._fetch_sem if throttle else nullcontext()
+        headers = await self.get_session_id()
+        try:
+            async with limiter:
+                return await self.req.request(
+                    method=method, url=url, headers=headers, **kwargs
+                )
+        except PetkitSessionExpiredError:
+            await self._renew_session(headers)
+        headers = await self.get_session_id()
+        async with limiter:
+            return await self.req.request(
+                method=method, url=url, headers=headers, **kwargs
+            )
 
     async def get_iot_device_info(self) -> NewIotInfo:
         """Fetch IoT/MQTT connection information for the current account.
@@ -272,10 +452,9 @@ class PetKitClient:
         device event notifications.
         """
         _LOGGER.debug("Fetching IoT device info (v2)")
-        response = await self.req.request(
+        response = await self._session_request(
             method=HTTPMethod.GET,
             url=PetkitEndpoint.IOT_DEVICE_INFO_V2,
-            headers=await self.get_session_id(),
         )
         _LOGGER.debug(
             "IoT device info raw response keys: %s",
@@ -329,30 +508,30 @@ class PetKitClient:
     async def _get_pet_details(self) -> list[PetDetails]:
         """Fetch pet details from the PetKit API."""
         _LOGGER.debug("Fetching user details")
-        response = await self.req.request(
+        response = await self._session_request(
             method=HTTPMethod.GET,
             url=PetkitEndpoint.DETAILS,
-            headers=await self.get_session_id(),
         )
         user_details = response.get("user", {})
         dogs = user_details.get("dogs", [])
-        return [PetDetails(**dog) for dog in dogs]
+        return get_list_adapter(PetDetails).validate_python(dogs)
 
     async def _get_account_data(self) -> None:
         """Get the account data from the PetKit service."""
         _LOGGER.debug("Fetching account data")
-        response = await self.req.request(
+        response = await self._session_request(
             method=HTTPMethod.GET,
             url=PetkitEndpoint.FAMILY_LIST,
-            headers=await self.get_session_id(),
         )
-        self.account_data = [AccountData(**account) for account in response]
+        self.account_data = get_list_adapter(AccountData).validate_python(response)
 
         # Add pets to device_list
+        self._pets_list = []
         for account in self.account_data:
             if account.pet_list:
                 for pet in account.pet_list:
                     self.petkit_entities[pet.pet_id] = pet
+                    self._pets_list.append(pet)
                     pet.device_nfo = Device(
                         deviceType=PET,
                         deviceId=pet.pet_id,
@@ -373,51 +552,78 @@ class PetKitClient:
 
     async def get_devices_data(self) -> None:
         """Get the devices data from the PetKit servers."""
-        start_time = datetime.now()
+        start_time = time.monotonic()
         if not self.account_data:
             await self._get_account_data()
 
         device_list = self._collect_devices()
-        main_tasks, record_tasks, media_tasks, live_tasks = self._prepare_tasks(
-            device_list
+        device_tasks = self._prepare_tasks(device_list)
+        results = await asyncio.gather(
+            *(task for _, task in device_tasks), return_exceptions=True
+        )
+        self._check_device_results(
+            [device for device, _ in device_tasks], list(results)
         )
 
-        await asyncio.gather(*main_tasks)
-        await asyncio.gather(*record_tasks)
-        await asyncio.gather(*media_tasks)
-        await asyncio.gather(*live_tasks)
-        await self._execute_stats_tasks()
-
-        end_time = datetime.now()
-        _LOGGER.debug("Petkit data fetched successfully in: %s", end_time - start_time)
+        _LOGGER.debug(
+            "Petkit data fetched successfully in: %.3fs", time.monotonic() - start_time
+        )
 
     def _collect_devices(self) -> list[Device]:
         """Collect all devices from account data.
         :return: List of devices.
         """
-        device_list = []
+        device_list: list[Device] = []
         for account in self.account_data:
-            _LOGGER.debug("List devices data for account: %s", account)
-            if account.device_list:
-                _LOGGER.debug("Devices in account: %s", account.device_list)
-                device_list.extend(account.device_list)
-                _LOGGER.debug("Found %s devices", len(account.device_list))
+            devices = account.device_list or []
+            _LOGGER.debug("Account %s has %s devices", account.group_id, len(devices))
+            device_list.extend(devices)
         return device_list
 
+    @staticmethod
+    def _check_device_results(devices: list[Device], results: list) -> None:
+        """Log the devices that failed to be fetched.
+        A failing device does not prevent the other ones from being updated. Errors
+        affecting the whole account, or a failure of every device, are raised.
+        :param devices: List of devices.
+        :param results: Result of the task chain of each device.
+        """
+        errors = [
+            (device, result)
+            for device, result in zip(devices, results, strict=True)
+            if isinstance(result, BaseException)
+        ]
+        for _, error in errors:
+            if not isinstance(error, Exception) or isinstance(error, ACCOUNT_ERRORS):
+                raise error
+        if errors and len(errors) == len(results):
+            raise errors[0][1]
+        for device, error in errors:
+            _LOGGER.warning(
+                "Failed to fetch data for device %s (id=%s): %r",
+                device.device_type,
+                device.device_id,
+                error,
+            )
+
     def _prepare_tasks(
         self, device_list: list[Device]
-    ) -> tuple[list, list, list, list]:
-        """Prepare main and record tasks based on device types.
+    ) -> list[tuple[Device, Coroutine[Any, Any, None]]]:
+        """Prepare one chain of tasks per device based on device types.
+        Devices are fetched concurrently, while each chain keeps the order
+        required by the data of a single device.
         :param device_list: List of devices.
-        :return: Tuple of main tasks, record tasks and media tasks.
+        :return: List of devices with their task chain.
         """
-        main_tasks: list = []
-        record_tasks: list = []
-        live_tasks: list = []
-        media_tasks: list = []
+        device_tasks: list[tuple[Device, Coroutine[Any, Any, None]]] = []
 
         for device in device_list:
             device_type = device.device_type
+            main_tasks: list = []
+            record_tasks: list = []
+            media_tasks: list = []
+            live_tasks: list = []
+            stats_tasks: list = []
 
             if device_type in DEVICES_FEEDER:
                 main_tasks.append(self._fetch_device_data(device, Feeder))
@@ -432,6 +638,7 @@ class PetKitClient:
                 self._add_lb_task_by_type(
                     record_tasks, media_tasks, live_tasks, device_type, device
                 )
+                stats_tasks.append(self._fetch_pet_stats(device))
 
             elif device_type in DEVICES_WATER_FOUNTAIN:
                 main_tasks.append(self._fetch_device_data(device, WaterFountain))
@@ -442,19 +649,51 @@ class PetKitClient:
             elif device_type in DEVICES_PURIFIER:
                 main_tasks.append(self._fetch_device_data(device, Purifier))
 
-        return main_tasks, record_tasks, media_tasks, live_tasks
+            if main_tasks:
+                # Records and live feed need the device entity, media and pet
+                # stats need the records
+                device_tasks.append(
+                    (
+                        device,
+                        self._run_task_stages(
+                            [
+                                main_tasks,
+                                [*record_tasks, *live_tasks],
+                                [*media_tasks, *stats_tasks],
+                            ]
+                        ),
+                    )
+                )
+
+        return device_tasks
+
+    @staticmethod
+    async def _run_task_stages(stages: list[list]) -> None:
+        """Run stages of tasks one after the other, tasks of a stage run concurrently.
+        If a stage fails, the tasks of the following stages are discarded.
+        :param stages: List of stages, each one being a list of tasks.
+        """
+        for index, stage in enumerate(stages):
+            try:
+                await asyncio.gather(*stage)
+            except BaseException:
+                for next_stage in stages[index + 1 :]:
+                    for task in next_stage:
+                        task.close()
+                raise
 
     def _add_lb_task_by_type(
         self,
         record_tasks: list,
-        live_tasks: list,
         media_tasks: list,
+        live_tasks: list,
         device_type: str,
         device: Device,
     ) -> None:
         """Add specific tasks for litter box devices.
         :param record_tasks: List of record tasks.
         :param media_tasks: List of media tasks.
+        :param live_tasks: List of live tasks.
         :param device_type: Device type.
         :param device: Device data.
         """
@@ -470,6 +709,7 @@ class PetKitClient:
     ) -> None:
         """Add specific tasks for feeder box devices.
         :param media_tasks: List of media tasks.
+        :param live_tasks: List of live tasks.
         :param device_type: Device type.
         :param device: Device data.
         """
@@ -477,14 +717,13 @@ class PetKitClient:
             media_tasks.append(self._fetch_media(device))
             live_tasks.append(self._fetch_device_data(device, LiveFeed))
 
-    async def _execute_stats_tasks(self) -> None:
-        """Execute tasks to populate pet stats."""
-        stats_tasks = [
-            self.populate_pet_stats(entity)
-            for device_id, entity in self.petkit_entities.items()
-            if isinstance(entity, Litter)
-        ]
-        await asyncio.gather(*stats_tasks)
+    async def _fetch_pet_stats(self, device: Device) -> None:
+        """Populate pet stats from the records of a litter box.
+        :param device: Device data.
+        """
+        entity = self.petkit_entities.get(device.device_id)
+        if isinstance(entity, Litter):
+            await self.populate_pet_stats(entity)
 
     async def _fetch_media(self, device: Device) -> None:
         """Fetch media data from the PetKit servers.
@@ -521,9 +760,9 @@ class PetKitClient:
 
         _LOGGER.debug("Reading device type : %s (id=%s)", device_type, device.device_id)
 
-        endpoint = data_class.get_endpoint(device_type)
+        url = get_device_data_url(data_class, device_type)
 
-        if endpoint is None:
+        if url is None:
             _LOGGER.debug("Endpoint not found for device type: %s", device_type)
             return
 
@@ -534,20 +773,20 @@ class PetKitClient:
 
         query_param = data_class.query_param(device, device_cont)
 
-        response = await self.req.request(
+        response = await self._session_request(
             method=HTTPMethod.POST,
-            url=f"{device_type}/{endpoint}",
+            url=url,
+            throttle=True,
             params=query_param,
-            headers=await self.get_session_id(),
         )
 
         # Workaround for the litter box T6
-        if isinstance(response, dict) and response.get("list", None):
-            response = response.get("list", [])
+        if isinstance(response, dict) and "list" in response:
+            response = response["list"] or []
 
         # Check if the response is a list or a dict
         if isinstance(response, list):
-            device_data = [data_class(**item) for item in response]
+            device_data = get_list_adapter(data_class).validate_python(response)
         elif isinstance(response, dict):
             device_data = data_class(**response)
         else:
@@ -555,9 +794,9 @@ class PetKitClient:
             return
 
         # Dispatch to the appropriate data handler
-        handler = data_handlers.get(data_class.data_type)
+        handler = self._data_handlers.get(data_class.data_type)
         if handler:
-            await handler(self, device, device_data, device_type)
+            await handler(device, device_data, device_type)
         else:
             _LOGGER.error("Unknown data type: %s", data_class.data_type)
 
@@ -617,15 +856,12 @@ class PetKitClient:
                 type(entity),
             )
 
-    async def get_pets_list(self) -> list[Pet]:
-        """Extract and return the list of pets.
+    def get_pets_list(self) -> list[Pet]:
+        """Return the list of pets.
+        The list is built along with the account data, when pets are added to the entities.
         :return: List of pets.
         """
-        return [
-            entity
-            for entity in self.petkit_entities.values()
-            if isinstance(entity, Pet)
-        ]
+        return self._pets_list
 
     @staticmethod
     def get_safe_value(value: int | None, default: int = 0) -> int:
@@ -657,17 +893,36 @@ class PetKitClient:
             )
             return
 
-        pets_list = await self.get_pets_list()
-        for pet in pets_list:
+        # Index the records by pet once, instead of scanning them for every pet
+        records_by_pet = self._group_by_pet(litter_data.device_records)
+        graph_by_pet = self._group_by_pet(litter_data.device_pet_graph_out)
+
+        for pet in self._pets_list:
+            pet_records = records_by_pet.get(pet.pet_id, [])
             if litter_data.device_nfo.device_type in [T3, T4]:
-                await self.init_pet_stats(pet, litter_data)
-                await self._process_litter_no_camera(pet, litter_data)
+                self.init_pet_stats(pet, litter_data)
+                self._process_litter_no_camera(pet, litter_data, pet_records)
             elif litter_data.device_nfo.device_type in [T5, T6]:
-                await self.init_pet_stats(pet, litter_data)
-                await self._process_litter_camera(pet, litter_data)
+                self.init_pet_stats(pet, litter_data)
+                self._process_litter_camera(
+                    pet, litter_data, pet_records, graph_by_pet.get(pet.pet_id, [])
+                )
 
     @staticmethod
-    async def init_pet_stats(pet: Pet, litter_data: Litter) -> None:
+    def _group_by_pet(
+        records: list[LitterRecord] | list[PetOutGraph],
+    ) -> dict[int | None, list]:
+        """Group litter records by pet ID.
+        :param records: List of records.
+        :return: Records grouped by pet ID.
+        """
+        grouped: dict[int | None, list] = defaultdict(list)
+        for record in records:
+            grouped[record.pet_id].append(record)
+        return grouped
+
+    @staticmethod
+    def init_pet_stats(pet: Pet, litter_data: Litter) -> None:
         """Initialize pet stats.
         Allow pet stats to be displayed in HA even if no data is available.
         :param pet: Pet data.
@@ -718,146 +973,127 @@ class PetKitClient:
         if value is not None:
             setattr(obj, attr, value)
 
-    async def _process_litter_no_camera(self, pet: Pet, litter_data: Litter) -> None:
+    def _process_litter_no_camera(
+        self, pet: Pet, litter_data: Litter, pet_records: list[LitterRecord]
+    ) -> None:
         """Process litter T3/T4 records (litter without camera).
         :param pet: Pet data.
         :param litter_data: Litter data.
+        :param pet_records: Litter records of the pet.
         """
-        for stat in (
-            s for s in litter_data.device_records or [] if isinstance(s, LitterRecord)
+        stat = max(
+            (s for s in pet_records if isinstance(s, LitterRecord)),
+            key=lambda s: s.timestamp or 0,
+            default=None,
+        )
+        if stat is None or (
+            pet.last_litter_usage is not None
+            and (stat.timestamp or 0) <= pet.last_litter_usage
         ):
-            if stat.pet_id == pet.pet_id and (
-                pet.last_litter_usage is None
-                or getattr(stat, "timestamp", 0) > pet.last_litter_usage
-            ):
-                self.set_if_not_none(pet, "last_litter_usage", stat.timestamp)
-                self.set_if_not_none(
-                    pet,
-                    "last_measured_weight",
-                    getattr(stat.content, "pet_weight", None) if stat.content else None,
-                )
-                self.set_if_not_none(
-                    pet,
-                    "last_duration_usage",
-                    (
-                        self.calculate_duration(
-                            stat.content.time_in, stat.content.time_out
-                        )
-                        if stat.content
-                        else None
-                    ),
-                )
-                device_name = getattr(litter_data.device_nfo, "device_name", None)
-                self.set_if_not_none(
-                    pet,
-                    "last_device_used",
-                    device_name.capitalize() if device_name is not None else None,
-                )
+            return
 
-    async def _process_litter_camera(self, pet: Pet, litter_data: Litter) -> None:
+        self.set_if_not_none(pet, "last_litter_usage", stat.timestamp)
+        self.set_if_not_none(
+            pet,
+            "last_measured_weight",
+            getattr(stat.content, "pet_weight", None) if stat.content else None,
+        )
+        self.set_if_not_none(
+            pet,
+            "last_duration_usage",
+            (
+                self.calculate_duration(stat.content.time_in, stat.content.time_out)
+                if stat.content
+                else None
+            ),
+        )
+        device_name = getattr(litter_data.device_nfo, "device_name", None)
+        self.set_if_not_none(
+            pet,
+            "last_device_used",
+            device_name.capitalize() if device_name is not None else None,
+        )
+
+    def _process_litter_camera(
+        self,
+        pet: Pet,
+        litter_data: Litter,
+        pet_records: list[LitterRecord],
+        pet_graph: list[PetOutGraph],
+    ) -> None:
         """Process litter T5/T6/T7 records (litter WITH camera).
         :param pet: Pet data.
         :param litter_data: Litter data.
+        :param pet_records: Litter records of the pet.
+        :param pet_graph: Pet out graph events of the pet.
         """
-        device_records = getattr(litter_data, "device_records", None)
-        device_pet_graph = getattr(litter_data, "device_pet_graph_out", None)
-
-        if not isinstance(device_records, list):
-            device_records = []
-        if not isinstance(device_pet_graph, list):
-            device_pet_graph = []
-
         # Get last_litter_usage, last_measured_weight, last_duration_usage from PetOutGraph
-        for value in device_pet_graph:
-            if value.pet_id == pet.pet_id and (
-                pet.last_litter_usage is None
-                or getattr(value, "time", 0) > pet.last_litter_usage
-            ):
-                self.set_if_not_none(
-                    pet, "last_litter_usage", getattr(value.content, "time", None)
-                )
-                self.set_if_not_none(
-                    pet,
-                    "last_measured_weight",
-                    getattr(value.content, "pet_weight", None),
-                )
-                self.set_if_not_none(
-                    pet, "last_duration_usage", getattr(value, "toilet_time", None)
-                )
-                device_name = getattr(litter_data.device_nfo, "device_name", None)
-                self.set_if_not_none(
-                    pet,
-                    "last_device_used",
-                    device_name.capitalize() if device_name else None,
-                )
-                self.set_if_not_none(pet, "last_event_id", value.event_id or None)
+        event = max(pet_graph, key=lambda v: v.time or 0, default=None)
+        if event is not None and (
+            pet.last_litter_usage is None or (event.time or 0) > pet.last_litter_usage
+        ):
+            self.set_if_not_none(
+                pet, "last_litter_usage", getattr(event.content, "time", None)
+            )
+            self.set_if_not_none(
+                pet,
+                "last_measured_weight",
+                getattr(event.content, "pet_weight", None),
+            )
+            self.set_if_not_none(
+                pet, "last_duration_usage", getattr(event, "toilet_time", None)
+            )
+            device_name = getattr(litter_data.device_nfo, "device_name", None)
+            self.set_if_not_none(
+                pet,
+                "last_device_used",
+                device_name.capitalize() if device_name else None,
+            )
+            self.set_if_not_none(pet, "last_event_id", event.event_id or None)
 
         # Get yowling_detected, anormal_ph_detected, measured_ph, soft_stool_detected, last_urination and last_defecation from LitterRecord
 
-        for value in device_records:
-            if value.pet_id == pet.pet_id and value.event_id == pet.last_event_id:
-                # yowling_detected
-                pet.yowling_detected = value.content.pet_voice if value.content else 0
+        for value in pet_records:
+            if value.event_id != pet.last_event_id:
+                continue
 
-                # anormal_ph_detected : bool
-                if (
-                    value.sub_content
-                    and value.sub_content[0]
-                    and value.sub_content[0].content
-                ):
-                    pet.abnormal_ph_detected = value.sub_content[0].content.ph_state
-
-                # measured_ph : float | None
-                if (
-                    value.sub_content
-                    and value.sub_content[0]
-                    and value.sub_content[0].content
-                    and value.sub_content[0].content.detection_info
-                ):
-                    pet.measured_ph = statistics.mean(
-                        item["ph"]
-                        for item in value.sub_content[0].content.detection_info
-                    )
-                else:
-                    pet.measured_ph = None
+            sub_content = value.sub_content[0] if value.sub_content else None
+            sc_content = sub_content.content if sub_content else None
 
+            # yowling_detected
+            pet.yowling_detected = value.content.pet_voice if value.content else 0
+
+            if sc_content:
+                # anormal_ph_detected : bool
+                pet.abnormal_ph_detected = sc_content.ph_state
                 # soft_stool_detected : bool
-                if (
-                    value.sub_content
-                    and value.sub_content[0]
-                    and value.sub_content[0].content
-                ):
-                    pet.soft_stool_detected = value.sub_content[0].content.soft_stools
+                pet.soft_stool_detected = sc_content.soft_stools
 
-                # last_urination : str | None
-                if (
-                    value.sub_content
-                    and value.sub_content[0]
-                    and value.sub_content[0].content
-                    and getattr(value.sub_content[0].content, "urine_bolus", None) == 1
-                    and value.timestamp is not None
-                ):
-                    pet.last_urination = value.timestamp
+            # measured_ph : float | None
+            if sc_content and sc_content.detection_info:
+                pet.measured_ph = statistics.fmean(
+                    item["ph"] for item in sc_content.detection_info
+                )
+            else:
+                pet.measured_ph = None
 
+            timestamp = value.timestamp
+            if sc_content and timestamp is not None:
+                # last_urination : str | None
+                if sc_content.urine_bolus == 1:
+                    pet.last_urination = timestamp
                 # last_defecation : str | None
-                if (
-                    value.sub_content
-                    and value.sub_content[0]
-                    and value.sub_content[0].content
-                    and getattr(value.sub_content[0].content, "hard_stools", None) == 1
-                    and value.timestamp is not None
-                ):
-                    pet.last_defecation = value.timestamp
+                if sc_content.hard_stools == 1:
+                    pet.last_defecation = timestamp
 
     async def get_cloud_video(self, video_url: str) -> dict[str, str | int] | None:
         """Get the video m3u8 link from the cloud.
         :param video_url: URL of the video.
         :return: Video data.
         """
-        response = await self.req.request(
+        response = await self._session_request(
             method=HTTPMethod.POST,
             url=video_url,
-            headers=await self.get_session_id(),
         )
         if not isinstance(response, list) or not response:
             _LOGGER.warning(
@@ -868,29 +1104,23 @@ class PetKitClient:
 
     async def extract_segments_m3u8(
         self, m3u8_url: str
-    ) -> tuple[Any, str | None, list[str | None]]:
+    ) -> tuple[Any, str | None, list[str]]:
         """Extract segments from the m3u8 file.
         :param: m3u8_url: URL of the m3u8 file
         :return: aes_key, key_iv, segment_lst
         """
+        headers = await self.get_session_id()
+
         # Extract segments from m3u8 file
         response = await self.req.request(
             method=HTTPMethod.GET,
             url=m3u8_url,
-            headers=await self.get_session_id(),
+            headers=headers,
         )
-        m3u8_obj = m3u8.loads(response[RES_KEY])
+        key_uri, key_iv, segment_lst = parse_m3u8(response[RES_KEY])
 
-        if not m3u8_obj.segments or not m3u8_obj.keys:
-            return None, None, []
-
-        # Extract segments from m3u8 file
-        segment_lst = [segment.uri for segment in m3u8_obj.segments]
-        # Extract key_uri and key_iv from m3u8 file
-        key_uri = m3u8_obj.keys[0].uri
-        key_iv = str(m3u8_obj.keys[0].iv)
-
-        if not key_uri or not key_iv:
+        # The IV attribute is optional in HLS, only the key and the segments are needed
+        if not segment_lst or not key_uri:
             return None, None, []
 
         # Extract aes_key from video segments
@@ -898,7 +1128,7 @@ class PetKitClient:
             method=HTTPMethod.GET,
             url=key_uri,
             full_url=True,
-            headers=await self.get_session_id(),
+            headers=headers,
         )
         return response[RES_KEY], key_iv, segment_lst
 
@@ -940,8 +1170,7 @@ class PetKitClient:
             raise PypetkitError(f"Action {action} not supported.")
 
         action_info = ACTIONS_MAP[action]
-        _LOGGER.debug(action)
-        _LOGGER.debug(action_info)
+        _LOGGER.debug("Action %s: %s", action, action_info)
         if device_type not in action_info.supported_device:
             _LOGGER.error(
                 "Device type %s not supported for action %s.", device_type, action
@@ -963,11 +1192,10 @@ class PetKitClient:
         else:
             params = action_info.params(device)
 
-        res = await self.req.request(
+        res = await self._session_request(
             method=HTTPMethod.POST,
             url=url,
             data=params,
-            headers=await self.get_session_id(),
         )
         _LOGGER.debug("Command execution success, API response : %s", res)
         return True
@@ -977,42 +1205,118 @@ class PrepReq:
     """Prepare the request to the PetKit API."""
 
     def __init__(
-        self, base_url: str, session: aiohttp.ClientSession, timezone: str, **kwargs
+        self,
+        base_url: str,
+        session: aiohttp.ClientSession | None,
+        timezone: str,
+        **kwargs,
     ) -> None:
         """Initialize the request."""
         self.base_url = base_url
         self.session = session
+        self._owns_session = session is None
+        self._session_lock = asyncio.Lock()
         self.timezone = timezone
-        self.base_headers: dict[str, str] = {}
+        self.base_headers: Mapping[str, str] | None = None
         self._debug_test = kwargs.pop(PTK_DBG, False)
+        self._connector_limit: int | None = kwargs.get(CONNECTOR_LIMIT)
+        if session is not None:
+            self._check_session_limit(
+                session,
+                kwargs.get(MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS),
+            )
 
-    async def _generate_header(self) -> dict[str, str]:
-        """Create header for interaction with API endpoint."""
-        return {
-            "Accept": Header.ACCEPT.value,
-            "Accept-Language": Header.ACCEPT_LANG.value,
-            "Accept-Encoding": Header.ENCODING.value,
-            "Content-Type": Header.CONTENT_TYPE.value,
-            "User-Agent": Header.AGENT.value,
-            "X-Img-Version": Header.IMG_VERSION.value,
-            "X-Locale": Header.LOCALE.value,
-            "X-Client": Header.CLIENT.value,
-            "X-Hour": Header.HOUR.value,
-            "X-TimezoneId": self.timezone,
-            "X-Api-Version": Header.API_VERSION.value,
-            "X-Timezone": await get_timezone_offset(self.timezone),
-        }
+    @staticmethod
+    def _check_session_limit(
+        session: aiohttp.ClientSession, max_concurrent_requests: int
+    ) -> None:
+        """Warn if the session provided by the caller has less connections than requests.
+        :param session: HTTP session provided by the caller.
+        :param max_concurrent_requests: Maximum number of requests sent at the same time.
+        """
+        connector = session.connector
+        if not isinstance(connector, aiohttp.BaseConnector):
+            return
+        limit = min(
+            (lim for lim in (connector.limit, connector.limit_per_host) if lim),
+            default=0,
+        )
+        if limit and limit < max_concurrent_requests:
+            _LOGGER.warning(
+                "HTTP session allows %s connections but up to %s requests are sent "
+                "concurrently, requests will wait for a free connection",
+                limit,
+                max_concurrent_requests,
+            )
+
+    @property
+    def base_url(self) -> str:
+        """Return the base URL of the API."""
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        """Set the base URL of the API, and the prefix joined to the endpoints."""
+        self._base_url = value
+        self._base_url_prefix = value.strip("/") + "/"
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session, creating a pooled one on first use.
+        A session provided by the caller is always used as is.
+        """
+        if self.session is not None and not (
+            self._owns_session and self.session.closed
+        ):
+            return self.session
+
+        async with self._session_lock:
+            if self.session is None or self.session.closed:
+                _LOGGER.debug("Creating a new pooled HTTP session")
+                self.session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=self._connector_limit or HTTP_POOL_LIMIT,
+                        limit_per_host=self._connector_limit
+                        or HTTP_POOL_LIMIT_PER_HOST,
+                        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                        use_dns_cache=True,
+                        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                        resolver=aiohttp.AsyncResolver() if HAS_AIODNS else None,
+                    )
+                )
+            return self.session
+
+    async def close(self) -> None:
+        """Close the HTTP session if it was created by this instance."""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _get_base_headers(self) -> Mapping[str, str]:
+        """Return the headers for interaction with API endpoint, created on first use.
+        The headers are read-only, as they are shared by all the requests.
+        """
+        if self.base_headers is None:
+            self.base_headers = MappingProxyType(
+                {
+                    **STATIC_HEADERS,
+                    "X-TimezoneId": self.timezone,
+                    "X-Timezone": await async_get_timezone_offset(self.timezone),
+                }
+            )
+        return self.base_headers
 
     @retry(
         stop=stop_after_attempt(5),
         wait=wait_exponential(multiplier=1, min=1, max=16),
-        retry=(
-            retry_if_exception_type(PetkitServerBusyError)
-            | retry_if_exception_type(aiohttp.ClientConnectorError)
-            | retry_if_exception_type(aiohttp.ClientOSError)
-            | retry_if_exception_type(aiohttp.ServerDisconnectedError)
-            | retry_if_exception_type(aiohttp.ClientResponseError)
-            | retry_if_exception_type(asyncio.TimeoutError)
+        retry=retry_if_exception_type(
+            (
+                PetkitServerBusyError,
+                aiohttp.ClientConnectorError,
+                aiohttp.ClientOSError,
+                aiohttp.ServerDisconnectedError,
+                aiohttp.ClientResponseError,
+                asyncio.TimeoutError,
+            )
         ),
         reraise=True,
     )
@@ -1023,7 +1327,7 @@ class PrepReq:
         full_url: bool = False,
         params=None,
         data=None,
-        headers=None,
+        headers: Mapping[str, str] | None = None,
     ) -> dict:
         """Make a request to the PetKit API.
         :param method: HTTP method.
@@ -1034,14 +1338,14 @@ class PrepReq:
         :param headers: Headers to send.
         :return: Response from the API.
         """
-        if not self.base_headers:
-            self.base_headers = await self._generate_header()
-
-        _url = url if full_url else "/".join(s.strip("/") for s in [self.base_url, url])
-        _headers = {**self.base_headers, **(headers or {})}
+        _url = url if full_url else self._base_url_prefix + url.strip("/")
+        # Base headers are only copied when the caller adds its own
+        base_headers = await self._get_base_headers()
+        _headers = {**base_headers, **headers} if headers else base_headers
         _LOGGER.debug("Request: %s %s", method, _url)
+        session = await self.get_session()
         try:
-            async with self.session.request(
+            async with session.request(
                 method,
                 _url,
                 params=params,
@@ -1076,12 +1380,17 @@ class PrepReq:
                 f"Request failed with status code {e.status}"
             ) from e
 
+        _LOGGER.debug(
+            "Response from %s (content encoding: %s)",
+            url,
+            response.headers.get("Content-Encoding", "identity"),
+        )
+        if response.content_type != "application/json":
+            return {RES_KEY: await response.text()}
+        # Decode the raw body, without converting it to text first
         try:
-            if response.content_type == "application/json":
-                response_json = await response.json()
-            else:
-                return {RES_KEY: await response.text()}
-        except ContentTypeError:
+            response_json = json_loads(await response.read())
+        except ValueError:
             raise PetkitInvalidResponseFormat(
                 "Response is not in JSON format"
             ) from None
@@ -1090,23 +1399,12 @@ class PrepReq:
             error_code = int(response_json[ERR_KEY].get("code", 0))
             error_msg = response_json[ERR_KEY].get("msg", "Unknown error")
 
-            match error_code:
-                case 1:
-                    raise PetkitServerBusyError(f"Server busy: {error_msg}")
-                case 5:
-                    raise PetkitSessionExpiredError(
-                        f"Session expired: {error_msg}. WARNING : Make sure you're not using your main PetKit app account. Use a separate one for Home Assistant. Refer to the documentation for more details."
-                    )
-                case 122:
-                    raise PetkitAuthenticationError(
-                        f"Authentication failed: {error_msg}"
-                    )
-                case 125:
-                    raise PetkitAuthenticationUnregisteredEmailError
-                case _:
-                    raise PypetkitError(
-                        f"Request failed code : {error_code}, details : {error_msg} url : {url}"
-                    )
+            error_factory = API_ERRORS.get(error_code)
+            if error_factory is not None:
+                raise error_factory(error_msg)
+            raise PypetkitError(
+                f"Request failed code : {error_code}, details : {error_msg} url : {url}"
+            )
 
         # Check for success in the response
         if RES_KEY in response_json:
@@ -1,6 +1,6 @@
 """Command module for PyPetkit"""
 
-from collections.abc import Callable
+from collections.abc import Callable, Collection
 from dataclasses import dataclass, field
 import datetime
 from enum import IntEnum, StrEnum
@@ -143,7 +143,11 @@ class CmdData:
 
     endpoint: str | Callable
     params: Callable
-    supported_device: list[str] = field(default_factory=list)
+    supported_device: Collection[str] = field(default_factory=frozenset)
+
+    def __post_init__(self) -> None:
+        """Store the supported devices as a set for fast lookups."""
+        self.supported_device = frozenset(self.supported_device)
 
 
 def get_endpoint_manual_feed(device):
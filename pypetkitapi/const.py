@@ -5,6 +5,8 @@ from enum import IntEnum, StrEnum
 DEFAULT_COUNTRY = "DE"
 DEFAULT_TZ = "Europe/Berlin"
 PTK_DBG = "enable_dbg"
+MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
 
 RES_KEY = "result"
 ERR_KEY = "error"
@@ -21,6 +23,13 @@ BLE_CONNECT_ATTEMPT = 32
 BLE_START_TRAME = [250, 252, 253]
 BLE_END_TRAME = [251]
 
+# HTTP connection pool (used when no session is provided by the caller)
+CONNECTOR_LIMIT = "connector_limit"
+HTTP_POOL_LIMIT = 20
+HTTP_POOL_LIMIT_PER_HOST = 10
+HTTP_KEEPALIVE_TIMEOUT = 75
+HTTP_DNS_CACHE_TTL = 300
+
 # PetKit Models
 FEEDER = "feeder"
 FEEDER_MINI = "feedermini"
@@ -85,6 +94,7 @@ class Header(StrEnum):
     ACCEPT = "*/*"
     ACCEPT_LANG = "en-US;q=1, it-US;q=0.9"
     ENCODING = "gzip, deflate"
+    ENCODING_BR = "br, gzip, deflate"
     API_VERSION = "12.4.9"
     CONTENT_TYPE = "application/x-www-form-urlencoded"
     AGENT = "okhttp/3.14.19"
@@ -136,16 +146,7 @@ class RecordType(StrEnum):
     DISH_AFTER = "dish_after"
 
 
-RecordTypeLST = [
-    RecordType.EAT,
-    RecordType.FEED,
-    RecordType.MOVE,
-    RecordType.PET,
-    RecordType.TOILETING,
-    RecordType.WASTE_CHECK,
-    RecordType.DISH_BEFORE,
-    RecordType.DISH_AFTER,
-]
+RecordTypeLST = tuple(RecordType)
 
 
 class BluetoothState(IntEnum):
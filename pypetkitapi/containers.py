@@ -1,8 +1,10 @@
 """Dataclasses container for petkit API."""
 
-from typing import Any, ClassVar
+from datetime import datetime, timedelta
+from functools import cached_property
+from typing import Any, ClassVar, Self
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 from pypetkitapi.const import LIVE_DATA, PetkitEndpoint
 
@@ -49,6 +51,12 @@ class SessionInfo(BaseModel):
     created_at: str = Field(alias="createdAt")
     refreshed_at: str | None = None
 
+    @cached_property
+    def expires_at(self) -> datetime:
+        """Return the expiration date of the session, parsed once from created_at."""
+        created = datetime.fromisoformat(self.created_at)
+        return created + timedelta(seconds=self.expires_in)
+
 
 class IotInfo(BaseModel):
     """Dataclass for IoT/MQTT connection information.
@@ -100,14 +108,14 @@ class Device(BaseModel):
 
     @field_validator("device_name", mode="before")
     def set_default_name(cls, value):  # noqa: N805
-        """Set default device_name if None or empty to avoid issues."""
+        """Set default device_name if None or empty to avoid issues, and lowercase it."""
         if value is None or not isinstance(value, str) or not value.strip():
             return "unnamed_device"
         return value.lower()
 
-    @field_validator("device_name", "device_type", "unique_id", mode="before")
+    @field_validator("device_type", "unique_id", mode="before")
     def convert_to_lower(cls, value):  # noqa: N805
-        """Convert device_name, device_type and unique_id to lowercase."""
+        """Convert device_type and unique_id to lowercase."""
         if value is not None and isinstance(value, str):
             return value.lower()
         return value
@@ -123,7 +131,7 @@ class PetDetails(BaseModel):
     birth: str | None = None
     block_time: int | None = Field(None, alias="blockTime")
     blocke: int | None = None
-    body_info: dict[str, Any] | None = Field(None, alias="bodyInfo")
+    body_info: dict[str, Any] | None = Field(None, alias="bodyInfo", repr=False)
     category: dict[str, Any]
     created_at: str | None = Field(None, alias="createdAt")
     device_count: int | None = Field(None, alias="deviceCount")
@@ -135,7 +143,9 @@ class PetDetails(BaseModel):
     is_royal_canin_pet: int | None = Field(None, alias="isRoyalCaninPet")
     male_state: int | None = Field(None, alias="maleState")
     name: str | None = None
-    oms_discern_pic: dict[str, Any] | None = Field(None, alias="omsDiscernPic")
+    oms_discern_pic: dict[str, Any] | None = Field(
+        None, alias="omsDiscernPic", repr=False
+    )
     owner: dict[str, Any] | None = None
     size: dict[str, Any] | None = None
     states: list[Any] | None = None
@@ -143,7 +153,9 @@ class PetDetails(BaseModel):
     updated_at: str | None = Field(None, alias="updatedAt")
     weight: float | None = None
     weight_control: int | None = Field(None, alias="weightControl")
-    weight_control_tips: dict[str, Any] | None = Field(None, alias="weightControlTips")
+    weight_control_tips: dict[str, Any] | None = Field(
+        None, alias="weightControlTips", repr=False
+    )
     weight_label: str | None = Field(None, alias="weightLabel")
 
 
@@ -176,14 +188,13 @@ class Pet(BaseModel):
     last_urination: int | None = None
     last_defecation: int | None = None
 
-    def __init__(self, **data):
-        """Initialize the Pet dataclass.
-        This method is used to fill the fictive fields after the standard initialization.
-        """
-        super().__init__(**data)
+    @model_validator(mode="after")
+    def fill_fictive_fields(self) -> Self:
+        """Fill the fictive fields after the standard validation."""
         self.id = self.id or self.pet_id
         self.sn = self.sn or str(self.id)
         self.name = self.name or self.pet_name
+        return self
 
 
 class UserDevice(BaseModel):
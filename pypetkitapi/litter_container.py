@@ -501,8 +501,8 @@ class Litter(BaseModel):
     created_at: str | None = Field(None, alias="createdAt")
     deodorant_tip: int | None = Field(None, alias="deodorantTip")
     device_nfo: Device | None = None
-    device_pet_graph_out: list[PetOutGraph] | None = None
-    device_records: list[LitterRecord] | None = None
+    device_pet_graph_out: list[PetOutGraph] = Field(default_factory=list)
+    device_records: list[LitterRecord] = Field(default_factory=list)
     device_stats: LitterStats | None = None
     firmware: float | str | None = None
     firmware_details: list[FirmwareDetail] = Field(alias="firmwareDetails")
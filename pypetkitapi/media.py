@@ -312,9 +312,7 @@ class MediaManager:
             record_list = getattr(records, record_type, [])
             for record in record_list:
                 media_files.extend(
-                    await self._process_feeder_record(
-                        record, RecordType(record_type), feeder
-                    )
+                    await self._process_feeder_record(record, record_type, feeder)
                 )
 
         return media_files
@@ -629,22 +627,23 @@ class DownloadDecryptMedia:
 
     async def _get_video_m3u8(self) -> None:
         """Iterate through m3u8 file and return all the ts file URLs."""
-        aes_key, iv_key, segments_lst = await self._get_m3u8_segments()
+        aes_key, _, segments_lst = await self._get_m3u8_segments()
         file_name = (
             f"{self.file_data.device_id}_{self.file_data.timestamp}.{MediaType.VIDEO}"
         )
 
-        if aes_key is None or iv_key is None or not segments_lst:
+        if aes_key is None or not segments_lst:
             _LOGGER.debug("Can't download video file %s", file_name)
             return
 
+        session = await self.client.get_http_session()
         if len(segments_lst) == 1:
-            await self._get_file(segments_lst[0], aes_key, file_name)
+            await self._get_file(segments_lst[0], aes_key, file_name, session)
             return
 
-        # Download segments in parallel
+        # Download segments in parallel, sharing the connections of the client session
         tasks = [
-            self._get_file(segment, aes_key, f"{index}_{file_name}")
+            self._get_file(segment, aes_key, f"{index}_{file_name}", session)
             for index, segment in enumerate(segments_lst, start=1)
         ]
         results = await asyncio.gather(*tasks)
@@ -664,7 +663,7 @@ class DownloadDecryptMedia:
             _LOGGER.debug("Concatenating video with %s segments", len(segment_files))
             await self._concat_segments(segment_files, file_name)
 
-    async def _get_m3u8_segments(self) -> tuple[Any, str | None, list[str | None]]:
+    async def _get_m3u8_segments(self) -> tuple[Any, str | None, list[str]]:
         """Extract the segments from a m3u8 file.
         :return: Tuple of AES key, IV key, and list of segment URLs
         """
@@ -682,20 +681,28 @@ class DownloadDecryptMedia:
         return await self.client.extract_segments_m3u8(str(media_api))
 
     async def _get_file(
-        self, url: str | None, aes_key: str | None, full_filename: str | None
+        self,
+        url: str | None,
+        aes_key: str | None,
+        full_filename: str | None,
+        session: aiohttp.ClientSession | None = None,
     ) -> bool:
         """Download a file from a URL and decrypt it.
         :param url: URL of the file to download.
         :param aes_key: AES key used for decryption.
         :param full_filename: Name of the file to save.
+        :param session: HTTP session to use, the client session if not provided.
         :return: True if the file was downloaded successfully, False otherwise.
         """
         if not url or not aes_key or not full_filename:
             _LOGGER.debug("Missing URL, AES key, or filename")
             return False
 
+        if session is None:
+            session = await self.client.get_http_session()
+
         # Download the file
-        async with aiohttp.ClientSession() as session, session.get(url) as response:
+        async with session.get(url) as response:
             if response.status != 200:
                 _LOGGER.error(
                     "Failed to download %s, status code: %s", url, response.status
@@ -4,31 +4,98 @@ import asyncio
 from datetime import datetime
 import importlib.metadata
 import logging
+import re
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 _LOGGER = logging.getLogger(__name__)
 
 
-async def get_timezone_offset(timezone_user: str) -> str:
-    """Get the timezone offset asynchronously."""
-
-    def get_tz():
-        try:
-            tz = ZoneInfo(timezone_user)
-            now = datetime.now(tz)
-            offset = now.utcoffset()
-            if offset is None:
-                return "0.0"
-            return str(offset.total_seconds() / 3600)
-        except (ZoneInfoNotFoundError, AttributeError) as e:
-            _LOGGER.warning(
-                "Cannot get timezone offset for '%s' ZoneInfo return : %s",
-                timezone_user,
-                e,
-            )
-            return "0.0"
-
-    return await asyncio.to_thread(get_tz)
+# Timezones already loaded, by name
+_ZONES: dict[str, ZoneInfo | None] = {}
+
+
+def get_zone(timezone_user: str) -> ZoneInfo | None:
+    """Return the timezone matching the name, loaded once per name."""
+    if timezone_user in _ZONES:
+        return _ZONES[timezone_user]
+    try:
+        zone: ZoneInfo | None = ZoneInfo(timezone_user)
+    except ZoneInfoNotFoundError as e:
+        _LOGGER.warning(
+            "Cannot get timezone offset for '%s' ZoneInfo return : %s",
+            timezone_user,
+            e,
+        )
+        zone = None
+    _ZONES[timezone_user] = zone
+    return zone
+
+
+def get_timezone_offset(timezone_user: str) -> str:
+    """Get the timezone offset.
+    Only the timezone is cached, the offset is computed on each call to follow DST changes.
+    """
+    tz = get_zone(timezone_user)
+    if tz is None:
+        return "0.0"
+    try:
+        offset = datetime.now(tz).utcoffset()
+    except AttributeError as e:
+        _LOGGER.warning(
+            "Cannot get timezone offset for '%s' ZoneInfo return : %s",
+            timezone_user,
+            e,
+        )
+        return "0.0"
+    if offset is None:
+        return "0.0"
+    return str(offset.total_seconds() / 3600)
+
+
+async def async_get_timezone_offset(timezone_user: str) -> str:
+    """Get the timezone offset from the event loop.
+    The first load of a timezone runs in a worker thread, as ZoneInfo reads it from disk.
+    """
+    if timezone_user not in _ZONES:
+        await asyncio.to_thread(get_zone, timezone_user)
+    return get_timezone_offset(timezone_user)
+
+
+# Attributes of a playlist tag, quoted values may contain commas
+M3U8_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def parse_m3u8(playlist: str) -> tuple[str | None, str | None, list[str]]:
+    """Extract the encryption key and the segments from a m3u8 media playlist.
+    Only the first EXT-X-KEY tag is read, the other tags are ignored.
+    :param playlist: Content of the m3u8 file.
+    :return: key_uri, key_iv, segment_lst
+    """
+    key_uri: str | None = None
+    key_iv: str | None = None
+    key_found = False
+    segment_lst: list[str] = []
+    expect_segment = False
+
+    for raw_line in playlist.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXT-X-KEY:") and not key_found:
+            key_found = True
+            attributes = {
+                name: value.strip('"')
+                for name, value in M3U8_ATTRIBUTE.findall(line[len("#EXT-X-KEY:") :])
+            }
+            key_uri = attributes.get("URI")
+            key_iv = attributes.get("IV")
+        elif line.startswith("#EXTINF:"):
+            expect_segment = True
+        elif expect_segment and not line.startswith("#"):
+            segment_lst.append(line)
+            expect_segment = False
+
+    return key_uri, key_iv, segment_lst
 
 
 def get_installed_packages():
@@ -162,7 +162,7 @@ class WaterFountain(BaseModel):
     update_at: str | None = Field(None, alias="updateAt")
     user_id: str | None = Field(None, alias="userId")
     water_pump_run_time: int | None = Field(None, alias="waterPumpRunTime")
-    device_records: list[WaterFountainRecord] | None = None
+    device_records: list[WaterFountainRecord] = Field(default_factory=list)
     device_nfo: Device | None = None
     ble_connection_state: int = 0
     ble_counter: int = 0
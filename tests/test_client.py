@@ -0,0 +1,598 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+import threading
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiohttp
+
+from pypetkitapi import client as client_module, utils
+from pypetkitapi.client import PetKitClient, PrepReq, get_device_data_url
+from pypetkitapi.const import PetkitEndpoint
+from pypetkitapi.containers import Device, LiveFeed, Pet, SessionInfo
+from pypetkitapi.exceptions import (
+    PetkitAuthenticationUnregisteredEmailError,
+    PetkitInvalidResponseFormat,
+    PetkitRegionalServerNotFoundError,
+    PetkitSessionExpiredError,
+    PetkitTimeoutError,
+    PypetkitError,
+)
+from pypetkitapi.litter_container import Litter, LitterRecord, PetOutGraph
+from pypetkitapi.water_fountain_container import WaterFountainRecord
+
+
+class TestPrepReq(unittest.IsolatedAsyncioTestCase):
+    async def test_owned_session_is_created_once(self):
+        req = PrepReq(base_url="https://example.com/", session=None, timezone="UTC")
+
+        session = await req.get_session()
+        self.assertIsInstance(session, aiohttp.ClientSession)
+        self.assertIs(await req.get_session(), session)
+
+        await req.close()
+        self.assertTrue(session.closed)
+        self.assertIsNone(req.session)
+
+    async def test_external_session_is_not_closed(self):
+        session = MagicMock(spec=aiohttp.ClientSession)
+        session.close = AsyncMock()
+        req = PrepReq(base_url="https://example.com/", session=session, timezone="UTC")
+
+        self.assertIs(await req.get_session(), session)
+        await req.close()
+        session.close.assert_not_awaited()
+
+    async def test_connector_limit_sizes_owned_pool(self):
+        req = PrepReq(
+            base_url="https://example.com/",
+            session=None,
+            timezone="UTC",
+            connector_limit=32,
+        )
+
+        session = await req.get_session()
+        self.assertEqual(session.connector.limit, 32)
+        self.assertEqual(session.connector.limit_per_host, 32)
+        await req.close()
+
+    async def test_small_external_pool_is_reported(self):
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=2)
+        ) as session:
+            with self.assertLogs("pypetkitapi.client", level="WARNING"):
+                PrepReq(
+                    base_url="https://example.com/", session=session, timezone="UTC"
+                )
+
+    async def test_url_is_joined_to_base_url(self):
+        session = MagicMock(spec=aiohttp.ClientSession)
+        req = PrepReq(
+            base_url="https://example.com/6/", session=session, timezone="UTC"
+        )
+        req._handle_response = AsyncMock(return_value={})
+
+        await req.request("GET", "/user/details2")
+        self.assertEqual(
+            session.request.call_args.args[1], "https://example.com/6/user/details2"
+        )
+
+        req.base_url = "https://other.com"
+        await req.request("GET", "user/details2")
+        self.assertEqual(
+            session.request.call_args.args[1], "https://other.com/user/details2"
+        )
+
+    async def test_api_error_codes_are_raised(self):
+        def make_response(code: int) -> MagicMock:
+            response = MagicMock(spec=aiohttp.ClientResponse)
+            response.content_type = "application/json"
+            response.read = AsyncMock(
+                return_value=b'{"error": {"code": %d, "msg": "error"}}' % code
+            )
+            return response
+
+        with self.assertRaises(PetkitSessionExpiredError):
+            await PrepReq._handle_response(make_response(5), "url")
+        with self.assertRaises(PetkitAuthenticationUnregisteredEmailError):
+            await PrepReq._handle_response(make_response(125), "url")
+        with self.assertRaisesRegex(PypetkitError, "code : 42"):
+            await PrepReq._handle_response(make_response(42), "url")
+
+    async def test_json_response_is_decoded(self):
+        response = MagicMock(spec=aiohttp.ClientResponse)
+        response.content_type = "application/json"
+        response.read = AsyncMock(return_value=b'{"result": {"list": [1, 2]}}')
+        self.assertEqual(
+            await PrepReq._handle_response(response, "url"), {"list": [1, 2]}
+        )
+
+        response.read = AsyncMock(return_value=b"<html>")
+        with self.assertRaises(PetkitInvalidResponseFormat):
+            await PrepReq._handle_response(response, "url")
+
+    async def test_brotli_is_accepted_only_when_installed(self):
+        req = PrepReq(base_url="https://example.com/", session=None, timezone="UTC")
+        headers = await req._get_base_headers()
+        self.assertEqual("br" in headers["Accept-Encoding"], client_module.HAS_BROTLI)
+
+    @patch("pypetkitapi.utils.ZoneInfo")
+    async def test_timezone_is_loaded_off_the_event_loop(self, mock_zoneinfo):
+        utils._ZONES.clear()
+        self.addCleanup(utils._ZONES.clear)
+        loop_thread = threading.get_ident()
+        load_threads = []
+        mock_zoneinfo.side_effect = lambda name: load_threads.append(
+            threading.get_ident()
+        )
+
+        req = PrepReq(
+            base_url="https://example.com/", session=None, timezone="America/New_York"
+        )
+        PetKitClient("user", "password", "US", "America/New_York")
+        self.assertEqual(load_threads, [])
+
+        headers = await req._get_base_headers()
+        self.assertEqual(headers["X-TimezoneId"], "America/New_York")
+        self.assertEqual(len(load_threads), 1)
+        self.assertNotEqual(load_threads[0], loop_thread)
+
+    async def test_base_headers_are_merged_only_when_needed(self):
+        session = MagicMock(spec=aiohttp.ClientSession)
+        req = PrepReq(base_url="https://example.com/", session=session, timezone="UTC")
+        req._handle_response = AsyncMock(return_value={})
+
+        await req.request("GET", "path")
+        base_headers = session.request.call_args.kwargs["headers"]
+        self.assertIs(base_headers, req.base_headers)
+
+        await req.request("GET", "path", headers={"X-Session": "id"})
+        headers = session.request.call_args.kwargs["headers"]
+        self.assertEqual(headers, {**req.base_headers, "X-Session": "id"})
+        self.assertNotIn("X-Session", req.base_headers)
+
+
+class TestDeviceDataUrl(unittest.TestCase):
+    def test_url_for_device_type(self):
+        self.assertEqual(
+            get_device_data_url(LitterRecord, "t6"),
+            f"t6/{PetkitEndpoint.GET_DEVICE_RECORD_RELEASE}",
+        )
+
+    def test_url_without_endpoint(self):
+        self.assertIsNone(get_device_data_url(WaterFountainRecord, "w5"))
+
+
+class TestPetKitClient(unittest.IsolatedAsyncioTestCase):
+    async def test_context_manager_closes_owned_session(self):
+        async with PetKitClient("user", "password", "FR", "Europe/Paris") as client:
+            session = await client.req.get_session()
+        self.assertTrue(session.closed)
+
+    async def test_http_session_is_the_request_session(self):
+        async with PetKitClient("user", "password", "FR", "Europe/Paris") as client:
+            session = await client.get_http_session()
+            self.assertIs(session, await client.req.get_session())
+
+    async def test_login_reuses_the_loaded_timezone(self):
+        utils._ZONES.clear()
+        self.addCleanup(utils._ZONES.clear)
+        client = PetKitClient("user", "password", "CN", "Asia/Shanghai")
+        client.req.request = AsyncMock(
+            return_value={
+                "session": {
+                    "id": "session_id",
+                    "userId": "user_id",
+                    "expiresIn": 3600,
+                    "createdAt": "2024-01-01T00:00:00.000+0000",
+                }
+            }
+        )
+
+        with patch(
+            "pypetkitapi.utils.asyncio.to_thread", wraps=utils.asyncio.to_thread
+        ) as mock_to_thread:
+            await client.login()
+            await client.login()
+
+        # The zone is loaded once, the offset is still computed on each login
+        mock_to_thread.assert_called_once()
+        for call in client.req.request.await_args_list:
+            self.assertIn("'timezone': '8.0'", call.kwargs["data"]["client"])
+
+    async def test_get_base_url_matches_region(self):
+        client = PetKitClient("user", "password", "France", "Europe/Paris")
+        client.req.request = AsyncMock(
+            return_value={
+                "list": [
+                    {
+                        "accountType": "email",
+                        "gateway": "https://api.eu-pet.com/6/",
+                        "id": "FR",
+                        "name": "France",
+                    },
+                    {
+                        "accountType": "email",
+                        "gateway": "https://api.petkt.com/latest/",
+                        "id": "US",
+                        "name": "United States",
+                    },
+                ]
+            }
+        )
+
+        await client._get_base_url()
+        self.assertEqual(client.region, "fr")
+        self.assertEqual(client.req.base_url, "https://api.eu-pet.com/6/")
+
+        # The regional server is cached for the next logins
+        await client._get_base_url()
+        client.req.request.assert_awaited_once()
+        self.assertEqual(client.req.base_url, "https://api.eu-pet.com/6/")
+
+    async def test_get_base_url_unknown_region(self):
+        client = PetKitClient("user", "password", "Atlantis", "Europe/Paris")
+        client.req.request = AsyncMock(return_value={"list": []})
+
+        with self.assertRaises(PetkitRegionalServerNotFoundError):
+            await client._get_base_url()
+
+    async def test_fetch_device_data_dispatches_to_handler(self):
+        client = PetKitClient("user", "password", "FR", "Europe/Paris")
+        client.get_session_id = AsyncMock(return_value={})
+        client.req.request = AsyncMock(return_value={"channelId": "channel"})
+        litter = MagicMock(spec=Litter)
+        client.petkit_entities[1] = litter
+        device = Device(
+            createdAt=0,
+            deviceId=1,
+            deviceName="Litter",
+            deviceType="t6",
+            groupId=0,
+            type=0,
+            uniqueId="1",
+        )
+
+        await client._fetch_device_data(device, LiveFeed)
+
+        self.assertIsInstance(litter.live_feed, LiveFeed)
+        self.assertEqual(litter.live_feed.channel_id, "channel")
+
+    async def test_fetch_device_data_parses_record_list(self):
+        client = PetKitClient("user", "password", "FR", "Europe/Paris")
+        client.get_session_id = AsyncMock(return_value={})
+        client.req.request = AsyncMock(
+            return_value={"list": [{"petId": 1, "timestamp": 100}, {"petId": 2}]}
+        )
+        litter = MagicMock(spec=Litter)
+        client.petkit_entities[1] = litter
+        device = Device(
+            createdAt=0,
+            deviceId=1,
+            deviceName="Litter",
+            deviceType="t6",
+            groupId=0,
+            type=0,
+            uniqueId="1",
+        )
+
+        await client._fetch_device_data(device, LitterRecord)
+
+        self.assertEqual([r.pet_id for r in litter.device_records], [1, 2])
+        self.assertIsInstance(litter.device_records[0], LitterRecord)
+
+    async def test_device_tasks_keep_dependency_order(self):
+        client = PetKitClient("user", "password", "FR", "Europe/Paris")
+        calls = []
+
+        async def fake_fetch(device, data_class):
+            calls.append(data_class)
+
+        async def fake_media(device):
+            calls.append("media")
+
+        client._fetch_device_data = fake_fetch
+        client._fetch_media = fake_media
+        device = Device(
+            createdAt=0,
+            deviceId=1,
+            deviceName="Litter",
+            deviceType="t6",
+            groupId=0,
+            type=0,
+            uniqueId="1",
+        )
+
+        tasks = client._prepare_tasks([device])
+        self.assertEqual(len(tasks), 1)
+        self.assertIs(tasks[0][0], device)
+        await tasks[0][1]
+
+        self.assertEqual(calls[0], Litter)
+        self.assertCountEqual(calls[1:4], [LitterRecord, PetOutGraph, LiveFeed])
+        self.assertEqual(calls[4], "media")
+
+    async def test_extract_segments_m3u8_validates_session_once(self):
+        client = PetKitClient("user", "password", "FR", "Europe/Paris")
+        client.get_session_id = AsyncMock(return_value={"X-Session": "id"})
+        playlist = (
+            "#EXTM3U\n"
+            '#EXT-X-KEY:METHOD=AES-128,URI="https://example.com/key",IV=0x1234\n'
+            "#EXTINF:10.0,\n"
+            "https://example.com/1.ts\n"
+        )
+        client.req.request = AsyncMock(
+            side_effect=[{"result": playlist}, {"result": "aes_key"}]
+        )
+
+        aes_key, key_iv, segments = await client.extract_segments_m3u8("video.m3u8")
+
+        self.assertEqual(aes_key, "aes_key")
+        self.assertEqual(key_iv, "0x1234")
+        self.assertEqual(segments, ["https://example.com/1.ts"])
+        client.get_session_id.assert_awaited_once()
+
+    async def test_extract_segments_m3u8_without_iv(self):
+        client = PetKitClient("user", "password", "FR", "Europe/Paris")
+        client.get_session_id = AsyncMock(return_value={"X-Session": "id"})
+        playlist = (
+            "#EXTM3U\n"
+            '#EXT-X-KEY:METHOD=AES-128,URI="https://example.com/key"\n'
+            "#EXTINF:10.0,\n"
+            "https://example.com/1.ts\n"
+        )
+        client.req.request = AsyncMock(
+            side_effect=[{"result": playlist}, {"result": "aes_key"}]
+        )
+
+        self.assertEqual(
+            await client.extract_segments_m3u8("video.m3u8"),
+            ("aes_key", None, ["https://example.com/1.ts"]),
+        )
+
+    async def test_account_data_builds_pets_list(self):
+        client = PetKitClient("user", "password", "FR", "Europe/Paris")
+        client.get_session_id = AsyncMock(return_value={})
+        client.req.request = AsyncMock(
+            return_value=[
+                {
+                    "groupId": 1,
+                    "petList": [
+                        {"avatar": "", "createdAt": 0, "petId": 1, "petName": "Cat"}
+                    ],
+                }
+            ]
+        )
+        client._get_pet_details = AsyncMock(return_value=[])
+
+        await client._get_account_data()
+        await client._get_account_data()
+
+        self.assertEqual([pet.pet_id for pet in client.get_pets_list()], [1])
+        self.assertIs(client.get_pets_list()[0], client.petkit_entities[1])
+
+    @staticmethod
+    def make_device(device_id: int) -> Device:
+        return Device(
+            createdAt=0,
+            deviceId=device_id,
+            deviceName="Purifier",
+            deviceType="k2",
+            groupId=0,
+            type=0,
+            uniqueId=str(device_id),
+        )
+
+    def test_failing_device_does_not_abort_others(self):
+        devices = [self.make_device(1), self.make_device(2)]
+
+        with self.assertLogs("pypetkitapi.client", level="WARNING") as logs:
+            PetKitClient._check_device_results(
+                devices, [None, PetkitTimeoutError("timeout")]
+            )
+        self.assertIn("id=2", logs.output[0])
+
+    def test_account_error_is_raised(self):
+        devices = [self.make_device(1), self.make_device(2)]
+
+        with self.assertRaises(PetkitSessionExpiredError):
+            PetKitClient._check_device_results(
+                devices, [None, PetkitSessionExpiredError("expired")]
+            )
+
+    def test_all_devices_failing_is_raised(self):
+        devices = [self.make_device(1), self.make_device(2)]
+
+        with self.assertRaises(PetkitTimeoutError):
+            PetKitClient._check_device_results(
+                devices, [PetkitTimeoutError("timeout"), PetkitTimeoutError("timeout")]
+            )
+
+
+class TestPetStats(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = PetKitClient("user", "password", "FR", "Europe/Paris")
+        for pet_id in (1, 2):
+            pet = Pet(avatar="", createdAt=0, petId=pet_id, petName=f"Pet {pet_id}")
+            self.client.petkit_entities[pet_id] = pet
+            self.client._pets_list.append(pet)
+
+    @staticmethod
+    def make_litter(device_type: str, records: list, graph: list | None = None):
+        litter = MagicMock(spec=Litter)
+        litter.device_nfo = MagicMock()
+        litter.device_nfo.device_type = device_type
+        litter.device_nfo.device_name = "litter"
+        litter.settings = None
+        litter.device_records = records
+        litter.device_pet_graph_out = graph or []
+        return litter
+
+    async def test_no_camera_uses_latest_record_of_each_pet(self):
+        records = [
+            LitterRecord(
+                petId=1,
+                timestamp=100,
+                content={"petWeight": 4000, "timeIn": 10, "timeOut": 40},
+            ),
+            LitterRecord(
+                petId=1,
+                timestamp=300,
+                content={"petWeight": 4200, "timeIn": 20, "timeOut": 80},
+            ),
+            LitterRecord(petId=2, timestamp=200, content={"petWeight": 3000}),
+        ]
+
+        await self.client.populate_pet_stats(self.make_litter("t4", records))
+
+        pet_1, pet_2 = self.client.petkit_entities[1], self.client.petkit_entities[2]
+        self.assertEqual(pet_1.last_litter_usage, 300)
+        self.assertEqual(pet_1.last_measured_weight, 4200)
+        self.assertEqual(pet_1.last_duration_usage, 60)
+        self.assertEqual(pet_1.last_device_used, "Litter")
+        self.assertEqual(pet_2.last_litter_usage, 200)
+        self.assertEqual(pet_2.last_measured_weight, 3000)
+
+    async def test_camera_uses_latest_event_of_each_pet(self):
+        graph = [
+            PetOutGraph(petId=1, time=100, eventId="e1", toiletTime=30),
+            PetOutGraph(petId=1, time=300, eventId="e3", toiletTime=50),
+            PetOutGraph(petId=2, time=200, eventId="e2", toiletTime=40),
+        ]
+        records = [
+            LitterRecord(petId=1, eventId="e1", timestamp=100, content={"petVoice": 0}),
+            LitterRecord(
+                petId=1,
+                eventId="e3",
+                timestamp=300,
+                content={"petVoice": 1},
+                subContent=[
+                    {
+                        "content": {
+                            "detectionInfo": [{"ph": 7}, {"ph": 8}],
+                            "phState": 1,
+                            "urineBolus": 1,
+                            "hardStools": 1,
+                        }
+                    }
+                ],
+            ),
+        ]
+
+        await self.client.populate_pet_stats(self.make_litter("t6", records, graph))
+
+        pet_1, pet_2 = self.client.petkit_entities[1], self.client.petkit_entities[2]
+        self.assertEqual(pet_1.last_event_id, "e3")
+        self.assertEqual(pet_1.last_duration_usage, 50)
+        self.assertEqual(pet_1.yowling_detected, 1)
+        self.assertEqual(pet_1.measured_ph, 7.5)
+        self.assertEqual(pet_1.abnormal_ph_detected, 1)
+        self.assertEqual(pet_1.last_urination, 300)
+        self.assertEqual(pet_1.last_defecation, 300)
+        self.assertEqual(pet_2.last_event_id, "e2")
+        self.assertEqual(pet_2.last_duration_usage, 40)
+
+
+class TestSession(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = PetKitClient("user", "password", "FR", "Europe/Paris")
+        self.client.login = AsyncMock()
+
+    @staticmethod
+    def make_session(created_at: datetime, expires_in: int = 3600) -> SessionInfo:
+        return SessionInfo(
+            id="session_id",
+            userId="user_id",
+            expiresIn=expires_in,
+            createdAt=created_at.strftime("%Y-%m-%dT%H:%M:%S.%f%z"),
+        )
+
+    async def test_no_session_triggers_login(self):
+        await self.client.validate_session()
+        self.client.login.assert_awaited_once()
+
+    async def test_valid_session_is_reused(self):
+        self.client._set_session(self.make_session(datetime.now(timezone.utc)))
+
+        headers = await self.client.get_session_id()
+        self.assertEqual(
+            headers, {"F-Session": "session_id", "X-Session": "session_id"}
+        )
+        self.assertIs(await self.client.get_session_id(), headers)
+        self.client.login.assert_not_awaited()
+
+    async def test_expired_session_triggers_login(self):
+        created = datetime.now(timezone.utc) - timedelta(hours=2)
+        self.client._set_session(self.make_session(created))
+
+        await self.client.validate_session()
+        self.client.login.assert_awaited_once()
+
+    async def test_concurrent_validation_logs_in_once(self):
+        async def fake_login():
+            await asyncio.sleep(0)
+            self.client._set_session(self.make_session(datetime.now(timezone.utc)))
+
+        self.client.login = AsyncMock(side_effect=fake_login)
+
+        await asyncio.gather(*(self.client.validate_session() for _ in range(5)))
+        self.client.login.assert_awaited_once()
+
+    async def test_rejected_session_logs_in_once(self):
+        self.client._set_session(self.make_session(datetime.now(timezone.utc)))
+        rejected_headers = self.client._session_headers
+
+        async def fake_login():
+            await asyncio.sleep(0)
+            self.client._set_session(self.make_session(datetime.now(timezone.utc)))
+
+        async def fake_request(method, url, headers, **kwargs):
+            await asyncio.sleep(0)
+            if headers is rejected_headers:
+                raise PetkitSessionExpiredError("expired")
+            return {"url": url}
+
+        self.client.login = AsyncMock(side_effect=fake_login)
+        self.client.req.request = AsyncMock(side_effect=fake_request)
+
+        results = await asyncio.gather(
+            *(self.client._session_request("GET", f"url{i}") for i in range(5))
+        )
+
+        self.assertEqual(results, [{"url": f"url{i}"} for i in range(5)])
+        self.client.login.assert_awaited_once()
+
+    async def test_login_does_not_hold_a_fetch_slot(self):
+        self.client._fetch_sem = asyncio.Semaphore(1)
+        self.client._set_session(self.make_session(datetime.now(timezone.utc)))
+        rejected_headers = self.client._session_headers
+        slot_held_during_login = []
+
+        async def fake_login():
+            slot_held_during_login.append(self.client._fetch_sem.locked())
+            await asyncio.sleep(0)
+            self.client._set_session(self.make_session(datetime.now(timezone.utc)))
+
+        async def fake_request(method, url, headers, **kwargs):
+            if headers is rejected_headers:
+                raise PetkitSessionExpiredError("expired")
+            return {"url": url}
+
+        self.client.login = AsyncMock(side_effect=fake_login)
+        self.client.req.request = AsyncMock(side_effect=fake_request)
+
+        # Re-login after the server rejected the session
+        result = await self.client._session_request("GET", "url", throttle=True)
+        self.assertEqual(result, {"url": "url"})
+
+        # Login of an expired session
+        created = datetime.now(timezone.utc) - timedelta(hours=2)
+        self.client._set_session(self.make_session(created))
+        await self.client._session_request("GET", "url", throttle=True)
+
+        self.assertEqual(slot_held_during_login, [False, False])
+        self.assertFalse(self.client._fetch_sem.locked())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -90,6 +90,13 @@ class TestCommandModule(unittest.TestCase):
         self.assertIn(DeviceCommand.UPDATE_SETTING, ACTIONS_MAP)
         self.assertIsInstance(ACTIONS_MAP[DeviceCommand.UPDATE_SETTING], CmdData)
 
+    def test_supported_device_is_frozenset(self):
+        for action_info in ACTIONS_MAP.values():
+            self.assertIsInstance(action_info.supported_device, frozenset)
+        self.assertIn(
+            FEEDER, ACTIONS_MAP[DeviceCommand.UPDATE_SETTING].supported_device
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -371,15 +371,17 @@ class TestMediaManager(unittest.IsolatedAsyncioTestCase):
         for mock_path in mock_paths:
             mock_path.unlink.assert_not_called()
 
-    @patch("pypetkitapi.media.aiohttp.ClientSession.get")
     @patch(
         "pypetkitapi.media.DownloadDecryptMedia._decrypt_data", new_callable=AsyncMock
     )
     @patch("pypetkitapi.media.DownloadDecryptMedia._save_file", new_callable=AsyncMock)
-    async def test_get_file(self, mock_save_file, mock_decrypt_data, mock_get):
+    async def test_get_file(self, mock_save_file, mock_decrypt_data):
         mock_response = MagicMock()
         mock_response.status = 200
         mock_response.read = AsyncMock(return_value=ENCRYPTED_DATA)
+        session = MagicMock()
+        self.client.get_http_session.return_value = session
+        mock_get = session.get
         mock_get.return_value.__aenter__.return_value = mock_response
         mock_decrypt_data.return_value = DECRYPTED_DATA
         mock_save_file.return_value = Path("/mock/download/path/test_file.jpg")
@@ -393,10 +395,12 @@ class TestMediaManager(unittest.IsolatedAsyncioTestCase):
         mock_decrypt_data.assert_called_once_with(ENCRYPTED_DATA, AES_KEY)
         mock_save_file.assert_called_once_with(DECRYPTED_DATA, "test_file.jpg")
 
-    @patch("pypetkitapi.media.aiohttp.ClientSession.get")
-    async def test_get_file_download_failure(self, mock_get):
+    async def test_get_file_download_failure(self):
         mock_response = MagicMock()
         mock_response.status = 404
+        session = MagicMock()
+        self.client.get_http_session.return_value = session
+        mock_get = session.get
         mock_get.return_value.__aenter__.return_value = mock_response
 
         result = await self.dl_decrypt_media._get_file(
@@ -406,6 +410,38 @@ class TestMediaManager(unittest.IsolatedAsyncioTestCase):
         self.assertFalse(result)
         mock_get.assert_called_once_with("http://example.com/file")
 
+    @patch(
+        "pypetkitapi.media.DownloadDecryptMedia._concat_segments",
+        new_callable=AsyncMock,
+    )
+    @patch("pypetkitapi.media.DownloadDecryptMedia._get_file", new_callable=AsyncMock)
+    async def test_get_video_m3u8_uses_client_session(self, mock_get_file, mock_concat):
+        """Test _get_video_m3u8 downloads all segments with the client session"""
+        self.dl_decrypt_media._get_m3u8_segments = AsyncMock(
+            return_value=(AES_KEY, "iv", ["http://a/1.ts", "http://a/2.ts"])
+        )
+        mock_get_file.return_value = True
+
+        await self.dl_decrypt_media._get_video_m3u8()
+
+        self.assertEqual(mock_get_file.await_count, 2)
+        session = self.client.get_http_session.return_value
+        for call in mock_get_file.await_args_list:
+            self.assertIs(call.args[3], session)
+        mock_concat.assert_awaited_once()
+
+    @patch("pypetkitapi.media.DownloadDecryptMedia._get_file", new_callable=AsyncMock)
+    async def test_get_video_m3u8_without_iv(self, mock_get_file):
+        """Test _get_video_m3u8 downloads a playlist without IV"""
+        self.dl_decrypt_media._get_m3u8_segments = AsyncMock(
+            return_value=(AES_KEY, None, ["http://a/1.ts"])
+        )
+
+        await self.dl_decrypt_media._get_video_m3u8()
+
+        mock_get_file.assert_awaited_once()
+        self.assertEqual(mock_get_file.await_args.args[:2], ("http://a/1.ts", AES_KEY))
+
     async def test_decrypt_data(self):
         """Test _decrypt_data method"""
         decrypted_data = await DownloadDecryptMedia._decrypt_data(
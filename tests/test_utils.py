@@ -2,50 +2,116 @@ import unittest
 from unittest.mock import patch
 from zoneinfo import ZoneInfoNotFoundError
 
-from pypetkitapi.utils import get_timezone_offset
+from pypetkitapi import utils
+from pypetkitapi.utils import async_get_timezone_offset, get_timezone_offset, parse_m3u8
 
 
 class TestUtils(unittest.TestCase):
 
+    def setUp(self):
+        utils._ZONES.clear()
+        self.addCleanup(utils._ZONES.clear)
+
     @patch("pypetkitapi.utils.ZoneInfo")
     @patch("pypetkitapi.utils.datetime")
-    async def test_get_timezone_offset_valid(self, mock_datetime, mock_zoneinfo):
+    def test_get_timezone_offset_valid(self, mock_datetime, mock_zoneinfo):
         # Mock datetime and ZoneInfo
         mock_zoneinfo.return_value = "MockedZone"
         mock_now = mock_datetime.now.return_value
         mock_now.utcoffset.return_value.total_seconds.return_value = 3600
 
-        offset = await get_timezone_offset("MockedZone")
+        offset = get_timezone_offset("MockedZone")
         self.assertEqual(offset, "1.0")
 
     @patch("pypetkitapi.utils.ZoneInfo")
     @patch("pypetkitapi.utils.datetime")
-    async def test_get_timezone_offset_no_offset(self, mock_datetime, mock_zoneinfo):
+    def test_get_timezone_offset_no_offset(self, mock_datetime, mock_zoneinfo):
         # Mock datetime and ZoneInfo
         mock_zoneinfo.return_value = "MockedZone"
         mock_now = mock_datetime.now.return_value
         mock_now.utcoffset.return_value = None
 
-        offset = await get_timezone_offset("MockedZone")
+        offset = get_timezone_offset("MockedZone")
         self.assertEqual(offset, "0.0")
 
     @patch("pypetkitapi.utils.ZoneInfo", side_effect=ZoneInfoNotFoundError)
-    async def test_get_timezone_offset_invalid_zone(self, mock_zoneinfo):
+    def test_get_timezone_offset_invalid_zone(self, mock_zoneinfo):
         offset = get_timezone_offset("InvalidZone")
         self.assertEqual(offset, "0.0")
 
     @patch("pypetkitapi.utils.ZoneInfo")
     @patch("pypetkitapi.utils.datetime")
-    async def test_get_timezone_offset_attribute_error(
-        self, mock_datetime, mock_zoneinfo
-    ):
+    def test_get_timezone_offset_attribute_error(self, mock_datetime, mock_zoneinfo):
         # Mock datetime and ZoneInfo
         mock_zoneinfo.return_value = "MockedZone"
         mock_datetime.now.side_effect = AttributeError
 
-        offset = await get_timezone_offset("MockedZone")
+        offset = get_timezone_offset("MockedZone")
         self.assertEqual(offset, "0.0")
 
+    @patch("pypetkitapi.utils.ZoneInfo")
+    @patch("pypetkitapi.utils.datetime")
+    def test_get_timezone_offset_follows_dst(self, mock_datetime, mock_zoneinfo):
+        # The zone is loaded once, the offset is computed on each call
+        mock_zoneinfo.return_value = "MockedZone"
+        mock_now = mock_datetime.now.return_value
+        mock_now.utcoffset.return_value.total_seconds.side_effect = [3600, 7200]
+
+        self.assertEqual(get_timezone_offset("MockedZone"), "1.0")
+        self.assertEqual(get_timezone_offset("MockedZone"), "2.0")
+        mock_zoneinfo.assert_called_once_with("MockedZone")
+
+    def test_parse_m3u8(self):
+        playlist = (
+            "#EXTM3U\n"
+            "#EXT-X-VERSION:3\n"
+            '#EXT-X-KEY:METHOD=AES-128,URI="https://example.com/key?a=1,b=2",IV=0x01\n'
+            "#EXTINF:10.0,\n"
+            "https://example.com/0.ts\n"
+            "#EXTINF:4.5,\n"
+            "1.ts\n"
+            "#EXT-X-ENDLIST\n"
+        )
+
+        key_uri, key_iv, segments = parse_m3u8(playlist)
+        self.assertEqual(key_uri, "https://example.com/key?a=1,b=2")
+        self.assertEqual(key_iv, "0x01")
+        self.assertEqual(segments, ["https://example.com/0.ts", "1.ts"])
+
+    def test_parse_m3u8_without_iv(self):
+        playlist = (
+            "#EXTM3U\n"
+            '#EXT-X-KEY:METHOD=AES-128,URI="https://example.com/key"\n'
+            "#EXTINF:10.0,\n"
+            "0.ts\n"
+        )
+        self.assertEqual(
+            parse_m3u8(playlist), ("https://example.com/key", None, ["0.ts"])
+        )
+
+    def test_parse_m3u8_without_key(self):
+        self.assertEqual(
+            parse_m3u8("#EXTM3U\n#EXTINF:10.0,\n0.ts\n"), (None, None, ["0.ts"])
+        )
+
+
+class TestAsyncTimezoneOffset(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        utils._ZONES.clear()
+        self.addCleanup(utils._ZONES.clear)
+
+    async def test_zone_is_loaded_off_the_loop_only_once(self):
+        with patch(
+            "pypetkitapi.utils.asyncio.to_thread", wraps=utils.asyncio.to_thread
+        ) as mock_to_thread:
+            first = await async_get_timezone_offset("Europe/Paris")
+            second = await async_get_timezone_offset("Europe/Paris")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, get_timezone_offset("Europe/Paris"))
+        mock_to_thread.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()